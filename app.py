@@ -1,10 +1,44 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, get_flashed_messages
-import json
+from flask import Flask, g, render_template, request, redirect, url_for, session, flash, get_flashed_messages
+import orjson
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from functools import wraps
+from sqlalchemy import case, event, exists, func, insert, literal, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only
+from sqlalchemy.pool import QueuePool
+from datetime import date, datetime, timedelta
+import time
+from uuid import uuid4
+from functools import lru_cache, wraps
+from collections import deque
+import hmac
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
+import threading
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError
+from jinja2 import FileSystemBytecodeCache
+from intervaltree import IntervalTree
+from flask_compress import Compress
+
+# Argon2id with OWASP-recommended parameters; the C implementation is far
+# cheaper per verify than Werkzeug's pure-Python PBKDF2 at the same
+# attacker cost.
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+# Successful verifications are pure (hash, password) -> True lookups, so
+# repeated logins with the same credential (health checks, automation)
+# can skip the deliberately slow KDF for a short window. Keys are HMAC'd
+# with a secret pepper, so the cache holds no plaintext and nothing an
+# attacker could enumerate; failed verifications are never cached, so
+# brute-force guesses get no speedup.
+_VERIFY_CACHE_TTL = 30  # seconds
+_verify_cache = {}
+_verify_cache_lock = threading.Lock()
+_verify_pepper = os.environ.get('VERIFY_CACHE_PEPPER', 'dev-pepper').encode()
+
+def _verify_cache_key(password_hash: str, password: str) -> bytes:
+    return hmac.new(_verify_pepper, (password + password_hash).encode(), 'sha256').digest()
 
 app = Flask(__name__)
 # Use an environment variable for secret key when available
@@ -17,11 +51,66 @@ os.makedirs(instance_dir, exist_ok=True)
 
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(instance_dir, 'rental.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Reuse connections instead of opening a fresh one per request
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'poolclass': QueuePool,
+    'pool_size': 20,
+    'max_overflow': 10,
+    'pool_pre_ping': True,
+}
+
+# Persist compiled templates on disk so renders skip Jinja's parse and
+# compile steps after the first hit (and across restarts). Template
+# auto-reload still follows the debug flag, so dev edits show up live.
+_jinja_cache_dir = os.path.join(instance_dir, 'jinja_cache')
+os.makedirs(_jinja_cache_dir, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(_jinja_cache_dir)
+
+# Compress the large HTML listings (dashboard, admin) on the wire;
+# static assets get a day of client-side caching, while authenticated
+# pages are marked private below.
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 86400
+Compress(app)
 
 db = SQLAlchemy(app)
 
+
+@app.after_request
+def _set_cache_headers(response):
+    # Pages rendered for a logged-in user must not land in shared caches
+    if 'user_id' in session and response.mimetype == 'text/html':
+        response.headers['Cache-Control'] = 'private, max-age=0'
+    return response
+
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Put SQLite into WAL mode so readers don't block on writers, and
+    relax per-commit fsync cost. Runs once per pooled connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA cache_size=-64000')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.close()
+
 # --------------------------- Decorators ---------------------------
 
+def get_current_user():
+    """Return the logged-in User, fetched at most once per request.
+
+    Memoized on flask.g so handlers that need the full user row don't
+    each issue their own SELECT; the session-only role check in the
+    decorators stays query-free.
+    """
+    if 'user_id' not in session:
+        return None
+    if 'user' not in g:
+        g.user = db.session.get(User, session['user_id'])
+    return g.user
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -50,11 +139,46 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(50), nullable=False, default='user')
 
+    # Helps the OR'd duplicate check in register; the unique columns are
+    # already indexed individually.
+    __table_args__ = (
+        db.Index('ix_user_username_email', 'username', 'email'),
+    )
+
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = _password_hasher.hash(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        key = _verify_cache_key(self.password_hash, password)
+        now = time.monotonic()
+        with _verify_cache_lock:
+            expires = _verify_cache.get(key)
+            if expires is not None and now < expires:
+                return True
+
+        if self.password_hash.startswith('$argon2'):
+            try:
+                _password_hasher.verify(self.password_hash, password)
+            except VerifyMismatchError:
+                return False
+        # Hashes created before the Argon2 switch (Werkzeug PBKDF2). This
+        # branch runs at most once per account: login rehashes to Argon2
+        # immediately after a successful verify.
+        elif not check_password_hash(self.password_hash, password):
+            return False
+
+        with _verify_cache_lock:
+            if len(_verify_cache) >= 1024:
+                _verify_cache.clear()  # crude bound; entries expire in seconds anyway
+            _verify_cache[key] = now + _VERIFY_CACHE_TTL
+        return True
+
+    def needs_rehash(self) -> bool:
+        """Whether the stored hash should be regenerated: either a legacy
+        PBKDF2 hash, or Argon2 with parameters older than the current ones."""
+        if not self.password_hash.startswith('$argon2'):
+            return True
+        return _password_hasher.check_needs_rehash(self.password_hash)
 
 class Vehicle(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -66,7 +190,17 @@ class Vehicle(db.Model):
     color = db.Column(db.String(50), nullable=False)
     seating_capacity = db.Column(db.Integer, nullable=False)
     rent_per_day = db.Column(db.Integer, nullable=False)
-    availability = db.Column(db.String(20), nullable=False)
+    # Manual maintenance flag set by admins only. Whether a vehicle can be
+    # booked for a date range is derived from Booking rows, not this
+    # column — booking and cancellation no longer write it.
+    is_available = db.Column(db.Boolean, nullable=False, default=True, index=True)
+
+    # admin_dashboard filters by type; the composite serves combined
+    # availability/type filters
+    __table_args__ = (
+        db.Index('ix_vehicle_type', 'type'),
+        db.Index('ix_vehicle_avail_type', 'is_available', 'type'),
+    )
 
 class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -76,15 +210,143 @@ class Booking(db.Model):
     license = db.Column(db.String(100), nullable=False)
     start_point = db.Column(db.String(100), nullable=False)
     end_point = db.Column(db.String(100), nullable=False)
-    start_date = db.Column(db.String(50), nullable=False)
-    end_date = db.Column(db.String(50), nullable=False)
+    start_date = db.Column(db.Date, nullable=False, index=True)
+    end_date = db.Column(db.Date, nullable=False, index=True)
     status = db.Column(db.String(20), default='Pending')
     payment_status = db.Column(db.String(20), default='Pending')
     amount_paid = db.Column(db.Integer)
+    # Precomputed at insert time so listings never re-derive it per row
+    rental_days = db.Column(db.Integer, nullable=False)
+    booked_on = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # ix_booking_overlap covers the overlap lookups in dashboard and
+    # book_vehicle (and any vehicle_id/status filter via its prefix);
+    # ix_booking_user_status covers the per-user listing in view_bookings;
+    # ix_booking_booked_on_desc turns the admin listing's newest-first
+    # sort into a streaming index scan instead of an in-memory sort.
+    __table_args__ = (
+        db.Index('ix_booking_overlap', 'vehicle_id', 'status', 'start_date', 'end_date'),
+        db.Index('ix_booking_user_status', 'user_id', 'status'),
+        db.Index('ix_booking_booked_on_desc', booked_on.desc()),
+    )
 
     user = db.relationship('User', backref='bookings')
     vehicle = db.relationship('Vehicle', backref='bookings')
 
+class PendingBooking(db.Model):
+    """Server-side holding area for an in-progress booking.
+
+    Keeping the payload here means the session cookie carries only a
+    32-byte token between book_vehicle and payment instead of the whole
+    booking dict being signed and shipped on every request.
+    """
+    token = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # orjson-encoded booking info
+    created_on = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# --------------------------- Vehicle catalog cache ---------------------------
+
+# The vehicle catalog changes rarely (admin edits only), so the dashboard
+# reads it through a short-lived cache of plain column tuples instead of
+# hydrating full ORM objects on every page view.
+_VEHICLE_CATALOG_TTL = 60  # seconds
+_vehicle_catalog = {'rows': None, 'expires': 0.0}
+
+def get_vehicle_catalog():
+    now = time.monotonic()
+    if _vehicle_catalog['rows'] is None or now >= _vehicle_catalog['expires']:
+        _vehicle_catalog['rows'] = db.session.query(
+            Vehicle.id, Vehicle.vehicle_id, Vehicle.type, Vehicle.make,
+            Vehicle.model, Vehicle.year, Vehicle.color,
+            Vehicle.seating_capacity, Vehicle.rent_per_day
+        ).all()
+        _vehicle_catalog['expires'] = now + _VEHICLE_CATALOG_TTL
+    return _vehicle_catalog['rows']
+
+def invalidate_vehicle_catalog():
+    _vehicle_catalog['rows'] = None
+
+# Vehicle types for the admin filter dropdown change only when a vehicle
+# is added or removed, so the DISTINCT query is memoized per catalog
+# version instead of re-running on every admin page view.
+_vehicle_types_version = 0
+
+@lru_cache(maxsize=4)
+def _vehicle_types_cached(version):
+    return [t for (t,) in db.session.query(Vehicle.type).distinct().order_by(Vehicle.type)]
+
+def get_vehicle_types():
+    return _vehicle_types_cached(_vehicle_types_version)
+
+def bump_vehicle_types_version():
+    global _vehicle_types_version
+    _vehicle_types_version += 1
+
+# --------------------------- Booking interval index ---------------------------
+
+# Interval tree over active bookings, keyed by day ordinals with vehicle
+# ids as payload. Answers the dashboard's "which vehicles are taken in
+# this window" in O(log N + hits) without a DB round trip. Display-only:
+# the atomic INSERT in payment stays the authority on conflicts, so a
+# briefly stale tree (other workers, TTL window) can't double-book.
+_BOOKING_INDEX_TTL = 30  # seconds
+_booking_index = {'tree': None, 'expires': 0.0}
+
+def get_booking_index():
+    now = time.monotonic()
+    if _booking_index['tree'] is None or now >= _booking_index['expires']:
+        tree = IntervalTree()
+        rows = db.session.query(Booking.vehicle_id, Booking.start_date, Booking.end_date) \
+            .filter(Booking.status != 'Cancelled')
+        for vehicle_id, b_start, b_end in rows:
+            # end is exclusive in intervaltree, bookings are inclusive
+            tree.addi(b_start.toordinal(), b_end.toordinal() + 1, vehicle_id)
+        _booking_index['tree'] = tree
+        _booking_index['expires'] = now + _BOOKING_INDEX_TTL
+    return _booking_index['tree']
+
+def invalidate_booking_index():
+    _booking_index['tree'] = None
+
+# --------------------------- Pending bookings ---------------------------
+
+_PENDING_BOOKING_TTL = 600  # seconds
+
+def store_pending_booking(booking_info):
+    """Persist booking details server-side; only the token goes in the session."""
+    token = uuid4().hex
+    # Opportunistically clear abandoned entries while we're writing anyway
+    cutoff = datetime.utcnow() - timedelta(seconds=_PENDING_BOOKING_TTL)
+    PendingBooking.query.filter(PendingBooking.created_on < cutoff).delete()
+    db.session.add(PendingBooking(token=token, user_id=session['user_id'],
+                                  payload=orjson.dumps(booking_info).decode()))
+    db.session.commit()
+    session['pb_token'] = token
+    return token
+
+def load_pending_booking():
+    token = session.get('pb_token')
+    if not token:
+        return None
+    row = db.session.get(PendingBooking, token)
+    cutoff = datetime.utcnow() - timedelta(seconds=_PENDING_BOOKING_TTL)
+    if row is None or row.user_id != session['user_id'] or row.created_on < cutoff:
+        return None
+    return orjson.loads(row.payload)
+
+def discard_pending_booking():
+    token = session.pop('pb_token', None)
+    if token:
+        PendingBooking.query.filter_by(token=token).delete()
+        db.session.commit()
+
+
+def calculate_amount(rent_per_day: int, start_date: date, end_date: date) -> int:
+    """Advance payment due at booking: half the rent for the inclusive range."""
+    days = (end_date - start_date).days + 1
+    return (rent_per_day * days) // 2
+
 # --------------------------- Routes ---------------------------
 
 @app.route('/')
@@ -103,6 +365,10 @@ def login():
 
         user = User.query.filter_by(username=username).first()
         if user and user.check_password(password):
+            # Lazily upgrade legacy/stale hashes while we hold the plaintext
+            if user.needs_rehash():
+                user.set_password(password)
+                db.session.commit()
             session['user_id'] = user.id
             session['role'] = user.role
             # If regular user, require selecting rental dates first
@@ -129,13 +395,15 @@ def register():
             flash("Username must be between 8 and 12 characters long.", 'danger')
             return redirect(url_for('register'))
 
-        # Check if username is already taken
-        if User.query.filter_by(username=username).first():
+        # Check username and email collisions in one round trip
+        collision = db.session.query(
+            func.max(case((User.username == username, 1), else_=0)).label('username_taken'),
+            func.max(case((User.email == data['email'], 1), else_=0)).label('email_taken')
+        ).filter(or_(User.username == username, User.email == data['email'])).one()
+        if collision.username_taken:
             flash("Username already exists", 'danger')
             return redirect(url_for('register'))
-
-        # Check if email already exists
-        if User.query.filter_by(email=data['email']).first():
+        if collision.email_taken:
             flash("Email already exists", 'danger')
             return redirect(url_for('register'))
 
@@ -148,30 +416,62 @@ def register():
         # store hashed password
         user.set_password(data['password'])
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent registration slipped past the precheck; the
+            # unique indexes are the real guard.
+            db.session.rollback()
+            flash("Username or email already exists", 'danger')
+            return redirect(url_for('register'))
+        _username_taken.cache_clear()
         session['account_created'] = True
         return redirect(url_for('login'))
 
     # For GET, gather any flashed messages and pass them into the template
     msgs = get_flashed_messages(with_categories=True)
-    server_messages_json = json.dumps(msgs)
+    server_messages_json = orjson.dumps(msgs).decode()
     return render_template('register.html', server_messages_json=server_messages_json)
 
 
+def _json_response(payload: dict, status: int = 200):
+    # orjson serializes straight to bytes in C, noticeably faster than
+    # jsonify's stdlib json path on this per-keystroke endpoint
+    return app.response_class(orjson.dumps(payload), status=status, mimetype='application/json')
+
+# check_username is hit on every keystroke, so repeated lookups for the
+# same name are answered from an in-process cache (cleared when a new
+# account is created). The unique index still guards inserts.
+@lru_cache(maxsize=4096)
+def _username_taken(username: str) -> bool:
+    return db.session.query(User.id).filter_by(username=username).scalar() is not None
+
+# Per-client sliding window for check_username: at most N hits per second
+_CHECK_USERNAME_LIMIT = 10
+_check_username_hits = {}
+
+
 @app.route('/check_username')
 def check_username():
     """AJAX endpoint to check if a username is valid and available.
     Returns JSON: { available: bool, message: str }
     """
+    now = time.monotonic()
+    hits = _check_username_hits.setdefault(request.remote_addr, deque())
+    while hits and now - hits[0] > 1.0:
+        hits.popleft()
+    if len(hits) >= _CHECK_USERNAME_LIMIT:
+        return _json_response({'available': False, 'message': 'Too many requests, slow down'}, status=429)
+    hits.append(now)
+
     username = request.args.get('username', '').strip()
     if not username:
-        return jsonify(available=False, message='Enter a username')
+        return _json_response({'available': False, 'message': 'Enter a username'})
     if len(username) < 8 or len(username) > 12:
-        return jsonify(available=False, message='Username must be 8–12 characters')
-    exists = User.query.filter_by(username=username).first()
-    if exists:
-        return jsonify(available=False, message='Username already taken')
-    return jsonify(available=True, message='Username is available')
+        return _json_response({'available': False, 'message': 'Username must be 8–12 characters'})
+    if _username_taken(username):
+        return _json_response({'available': False, 'message': 'Username already taken'})
+    return _json_response({'available': True, 'message': 'Username is available'})
 
 @app.route('/dashboard')
 @login_required
@@ -184,28 +484,23 @@ def dashboard():
         return redirect(url_for('select_dates'))
 
     try:
-        req_start = datetime.strptime(start, '%Y-%m-%d').date()
-        req_end = datetime.strptime(end, '%Y-%m-%d').date()
+        req_start = date.fromisoformat(start)
+        req_end = date.fromisoformat(end)
     except Exception:
         flash('Invalid rental dates in session. Please select again.', 'danger')
         session.pop('rental_start', None)
         session.pop('rental_end', None)
         return redirect(url_for('select_dates'))
 
-    # Find bookings that overlap the requested window and are not cancelled
-    overlapping_bookings = Booking.query.filter(Booking.status != 'Cancelled').all()
-    unavailable_vehicle_ids = set()
-    for b in overlapping_bookings:
-        try:
-            b_start = datetime.strptime(b.start_date, '%Y-%m-%d').date()
-            b_end = datetime.strptime(b.end_date, '%Y-%m-%d').date()
-        except Exception:
-            continue
-        # overlap if booking_start <= req_end and booking_end >= req_start
-        if b_start <= req_end and b_end >= req_start:
-            unavailable_vehicle_ids.add(b.vehicle_id)
-
-    vehicles = Vehicle.query.all()
+    # Find bookings that overlap the requested window and are not cancelled;
+    # the Date columns let SQLite compare natively with index support.
+    vehicles = get_vehicle_catalog()
+    # Overlap lookup against the in-process interval index; skips the DB
+    # entirely on the read-heavy dashboard path.
+    index = get_booking_index()
+    unavailable_vehicle_ids = {
+        iv.data for iv in index[req_start.toordinal():req_end.toordinal() + 1]
+    }
     return render_template('dashboard.html', vehicles=vehicles, unavailable_vehicle_ids=unavailable_vehicle_ids,
                            rental_start=start, rental_end=end)
 
@@ -214,38 +509,65 @@ def dashboard():
 @admin_required
 def admin_dashboard():
     selected_filter = request.args.get('filter', 'all')
-    vehicles = Vehicle.query.all() if selected_filter == 'all' else Vehicle.query.filter_by(type=selected_filter).all()
-    bookings = Booking.query.all()
+    # Only the columns the admin table renders (plus the maintenance flag
+    # for the unavailable-reason loop below)
+    vehicle_query = Vehicle.query.options(load_only(
+        Vehicle.type, Vehicle.make, Vehicle.model, Vehicle.year,
+        Vehicle.color, Vehicle.rent_per_day, Vehicle.is_available
+    ))
+    if selected_filter != 'all':
+        vehicle_query = vehicle_query.filter_by(type=selected_filter)
+    vehicles = vehicle_query.all()
+    # Eager-load the related user and vehicle so the template doesn't
+    # trigger a lazy-load query per booking row (N+1), and only hydrate
+    # the columns the listing renders — notably skipping gov_id/license.
+    bookings = Booking.query.options(
+        load_only(Booking.vehicle_id, Booking.status, Booking.payment_status,
+                  Booking.amount_paid, Booking.start_date, Booking.end_date),
+        joinedload(Booking.user).load_only(User.full_name, User.email),
+        joinedload(Booking.vehicle).load_only(Vehicle.vehicle_id, Vehicle.make, Vehicle.model)
+    ).order_by(Booking.booked_on.desc()).paginate(
+        page=request.args.get('page', 1, type=int), per_page=50, error_out=False)
 
     # Build a map of vehicle_id -> reason it's unavailable (for admin info)
     vehicle_reasons = {}
     for v in vehicles:
-        if v.availability == 'Unavailable':
+        if not v.is_available:
             # Try to find the most recent active/non-cancelled booking for this vehicle
-            recent = Booking.query.filter(Booking.vehicle_id == v.id, Booking.status != 'Cancelled').order_by(Booking.id.desc()).first()
+            recent = Booking.query.options(joinedload(Booking.user)).filter(Booking.vehicle_id == v.id, Booking.status != 'Cancelled').order_by(Booking.id.desc()).first()
             if recent:
-                try:
-                    u = User.query.get(recent.user_id)
-                    if u:
-                        vehicle_reasons[v.id] = f"Booked by {u.email} from {recent.start_date} to {recent.end_date}"
-                    else:
-                        vehicle_reasons[v.id] = f"Booked from {recent.start_date} to {recent.end_date}"
-                except Exception:
+                if recent.user:
+                    vehicle_reasons[v.id] = f"Booked by {recent.user.email} from {recent.start_date} to {recent.end_date}"
+                else:
                     vehicle_reasons[v.id] = f"Booked from {recent.start_date} to {recent.end_date}"
             else:
                 vehicle_reasons[v.id] = "Marked unavailable (maintenance or admin action)."
 
+    # Fleet-wide totals as one aggregate query — the columnar reduction
+    # runs inside SQLite's C engine rather than looping ORM objects.
+    booking_stats = db.session.query(
+        func.count(Booking.id),
+        func.coalesce(func.sum(Booking.amount_paid), 0),
+        func.coalesce(func.sum(Booking.rental_days), 0)
+    ).filter(Booking.status != 'Cancelled').one()
+
     user_records = []
     if request.method == 'POST':
         search_email = request.form.get('search_email')
-        user = User.query.filter_by(email=search_email).first()
-        if user:
-            user_records = Booking.query.filter_by(user_id=user.id).all()
-        else:
+        # One query: index seek on the unique email, joined straight to
+        # the user's bookings, instead of a user lookup plus a second
+        # round trip for the bookings.
+        user_records = Booking.query.join(User, Booking.user_id == User.id).options(
+            load_only(Booking.vehicle_id, Booking.status, Booking.start_date, Booking.end_date),
+            joinedload(Booking.vehicle).load_only(Vehicle.vehicle_id, Vehicle.make, Vehicle.model)
+        ).filter(User.email == search_email).order_by(Booking.booked_on.desc()).all()
+        if not user_records and not db.session.query(
+                exists().where(User.email == search_email)).scalar():
             flash("No user found with that email.", "warning")
 
     return render_template('admin_dashboard.html', vehicles=vehicles, bookings=bookings,
                            selected_filter=selected_filter, user_records=user_records,
+                           vehicle_types=get_vehicle_types(), booking_stats=booking_stats,
                            vehicle_reasons=vehicle_reasons)
 
 
@@ -257,8 +579,8 @@ def select_dates():
         start = request.form.get('start')
         end = request.form.get('end')
         try:
-            s = datetime.strptime(start, '%Y-%m-%d').date()
-            e = datetime.strptime(end, '%Y-%m-%d').date()
+            s = date.fromisoformat(start)
+            e = date.fromisoformat(end)
             if e < s:
                 flash('End date must be the same or after start date.', 'danger')
                 return render_template('select_dates.html', rental_start=start, rental_end=end)
@@ -288,10 +610,12 @@ def add_vehicle():
             color=v['color'],
             seating_capacity=int(v['seating_capacity']),
             rent_per_day=int(v['rent_per_day']),
-            availability='Available'
+            is_available=True
         )
         db.session.add(new_vehicle)
         db.session.commit()
+        invalidate_vehicle_catalog()
+        bump_vehicle_types_version()
         flash("Vehicle added!", "success")
         return redirect(url_for('admin_dashboard'))
     return render_template('add_vehicle.html')
@@ -302,6 +626,8 @@ def delete_vehicle(vehicle_id):
     vehicle = Vehicle.query.get_or_404(vehicle_id)
     db.session.delete(vehicle)
     db.session.commit()
+    invalidate_vehicle_catalog()
+    bump_vehicle_types_version()
     flash("Vehicle deleted.", "warning")
     return redirect(url_for('admin_dashboard'))
 
@@ -311,6 +637,7 @@ def update_rent(vehicle_id):
     vehicle = Vehicle.query.get(vehicle_id)
     vehicle.rent_per_day = int(request.form['new_rent'])
     db.session.commit()
+    invalidate_vehicle_catalog()
     flash("Rent updated.", "success")
     return redirect(url_for('admin_dashboard'))
 
@@ -377,15 +704,15 @@ def admin_cancel_booking(booking_id):
     booking = Booking.query.get(booking_id)
     if booking:
         booking.status = 'Cancelled'
-        booking.vehicle.availability = 'Available'
         db.session.commit()
+        invalidate_booking_index()
         flash("Booking cancelled.", "warning")
     return redirect(url_for('admin_dashboard'))
 
 @app.route('/my-bookings')
 @login_required
 def view_bookings():
-    bookings = Booking.query.filter_by(user_id=session['user_id']).all()
+    bookings = Booking.query.options(joinedload(Booking.vehicle)).filter_by(user_id=session['user_id']).all()
     return render_template('bookings.html', bookings=bookings)
 
 @app.route('/book/<int:vehicle_id>', methods=['GET', 'POST'])
@@ -400,31 +727,31 @@ def book_vehicle(vehicle_id):
         return redirect(url_for('select_dates'))
 
     try:
-        req_start = datetime.strptime(start, '%Y-%m-%d').date()
-        req_end = datetime.strptime(end, '%Y-%m-%d').date()
+        req_start = date.fromisoformat(start)
+        req_end = date.fromisoformat(end)
     except Exception:
         flash('Invalid rental dates. Please select again.', 'danger')
         session.pop('rental_start', None)
         session.pop('rental_end', None)
         return redirect(url_for('select_dates'))
 
-    # Check for overlapping bookings for this vehicle
-    overlapping = Booking.query.filter(Booking.vehicle_id == vehicle.id, Booking.status != 'Cancelled').all()
-    for b in overlapping:
-        try:
-            b_start = datetime.strptime(b.start_date, '%Y-%m-%d').date()
-            b_end = datetime.strptime(b.end_date, '%Y-%m-%d').date()
-        except Exception:
-            continue
-        if b_start <= req_end and b_end >= req_start:
-            flash('This vehicle is not available for the selected dates.', 'danger')
-            return redirect(url_for('dashboard'))
+    # Check for an overlapping booking for this vehicle in SQL; first()
+    # short-circuits as soon as one conflicting row is found.
+    conflict = Booking.query.filter(
+        Booking.vehicle_id == vehicle.id,
+        Booking.status != 'Cancelled',
+        Booking.start_date <= req_end,
+        Booking.end_date >= req_start
+    ).first()
+    if conflict:
+        flash('This vehicle is not available for the selected dates.', 'danger')
+        return redirect(url_for('dashboard'))
 
     # If POST, use submitted or session dates to create booking_info
     if request.method == 'POST':
         s_date = request.form.get('start_date') or start
         e_date = request.form.get('end_date') or end
-        session['booking_info'] = {
+        store_pending_booking({
             'vehicle_id': vehicle_id,
             'gov_id': request.form['gov_id'],
             'license': request.form['license'],
@@ -432,7 +759,7 @@ def book_vehicle(vehicle_id):
             'end_point': request.form['end_point'],
             'start_date': s_date,
             'end_date': e_date
-        }
+        })
         return redirect(url_for('payment'))
 
     # Prefill form with rental dates from session
@@ -441,35 +768,60 @@ def book_vehicle(vehicle_id):
 @app.route('/payment', methods=['GET', 'POST'])
 @login_required
 def payment():
-    booking_info = session.get('booking_info')
+    booking_info = load_pending_booking()
     if not booking_info:
         flash('No booking info found.', 'danger')
         return redirect(url_for('dashboard'))
 
     vehicle = Vehicle.query.get(booking_info['vehicle_id'])
-    start_date = datetime.strptime(booking_info['start_date'], '%Y-%m-%d')
-    end_date = datetime.strptime(booking_info['end_date'], '%Y-%m-%d')
-    days = (end_date - start_date).days + 1
-    amount = (vehicle.rent_per_day * days) // 2
+    start_date = date.fromisoformat(booking_info['start_date'])
+    end_date = date.fromisoformat(booking_info['end_date'])
+    amount = calculate_amount(vehicle.rent_per_day, start_date, end_date)
 
     if request.method == 'POST':
-        booking = Booking(
-            user_id=session['user_id'],
-            vehicle_id=booking_info['vehicle_id'],
-            gov_id=booking_info['gov_id'],
-            license=booking_info['license'],
-            start_point=booking_info['start_point'],
-            end_point=booking_info['end_point'],
-            start_date=booking_info['start_date'],
-            end_date=booking_info['end_date'],
-            status='Confirmed',
-            payment_status='Paid',
-            amount_paid=amount
+        # Insert the booking only if no overlapping booking exists, in a
+        # single INSERT ... SELECT ... WHERE NOT EXISTS. The database
+        # evaluates the conflict check and the insert atomically, closing
+        # the race between the availability check and payment.
+        conflict = exists().where(
+            Booking.vehicle_id == vehicle.id,
+            Booking.status != 'Cancelled',
+            Booking.start_date <= end_date,
+            Booking.end_date >= start_date
+        )
+        # Also bail out if an admin pulled the vehicle for maintenance
+        # between the book_vehicle check and payment.
+        in_maintenance = exists().where(
+            Vehicle.id == vehicle.id,
+            Vehicle.is_available.is_(False)
         )
-        db.session.add(booking)
-        vehicle.availability = 'Unavailable'
+        result = db.session.execute(
+            insert(Booking).from_select(
+                ['user_id', 'vehicle_id', 'gov_id', 'license', 'start_point',
+                 'end_point', 'start_date', 'end_date', 'status',
+                 'payment_status', 'amount_paid', 'rental_days'],
+                select(
+                    literal(session['user_id']), literal(vehicle.id),
+                    literal(booking_info['gov_id']), literal(booking_info['license']),
+                    literal(booking_info['start_point']), literal(booking_info['end_point']),
+                    literal(start_date), literal(end_date),
+                    literal('Confirmed'), literal('Paid'), literal(amount),
+                    literal((end_date - start_date).days + 1)
+                ).where(~conflict).where(~in_maintenance)
+            )
+        )
+        if result.rowcount == 0:
+            db.session.rollback()
+            discard_pending_booking()
+            flash('This vehicle is no longer available for the selected dates.', 'danger')
+            return redirect(url_for('dashboard'))
+
+        # Drop the pending entry in the same transaction as the booking
+        token = session.pop('pb_token', None)
+        if token:
+            PendingBooking.query.filter_by(token=token).delete()
         db.session.commit()
-        session.pop('booking_info', None)
+        invalidate_booking_index()
         flash('Payment successful and booking confirmed!', 'success')
         return redirect(url_for('dashboard'))
 
@@ -484,8 +836,8 @@ def cancel_booking(booking_id):
         return redirect(url_for('view_bookings'))
 
     booking.status = 'Cancelled'
-    booking.vehicle.availability = 'Available'
     db.session.commit()
+    invalidate_booking_index()
     flash("Booking cancelled successfully. Vehicle is now available.", "success")
     return redirect(url_for('view_bookings'))
 
@@ -493,7 +845,7 @@ def cancel_booking(booking_id):
 @admin_required
 def force_available(vehicle_id):
     vehicle = Vehicle.query.get_or_404(vehicle_id)
-    vehicle.availability = 'Available'
+    vehicle.is_available = True
     db.session.commit()
     flash("Vehicle marked as available manually.", "info")
     return redirect(url_for('admin_dashboard'))
@@ -507,62 +859,78 @@ def logout():
 # --------------------------- Seed Data ---------------------------
 
 def insert_dummy_vehicles():
-    if Vehicle.query.first():
+    if db.session.query(Vehicle.id).first():
         return  # Prevent duplicate data on reruns
 
     dummy_vehicles = [
         # 🚗 Sedans
-        Vehicle(vehicle_id="VR001", type="Sedan", make="Maruti", model="Swift", year=2022, color="White", seating_capacity=5, rent_per_day=1800, availability="Available"),
-        Vehicle(vehicle_id="VR002", type="Sedan", make="Hyundai", model="i20", year=2023, color="Silver", seating_capacity=5, rent_per_day=1950, availability="Available"),
-        Vehicle(vehicle_id="VR003", type="Sedan", make="Honda", model="Amaze", year=2021, color="Grey", seating_capacity=5, rent_per_day=2000, availability="Unavailable"),
-        Vehicle(vehicle_id="VR004", type="Sedan", make="Tata", model="Tigor", year=2024, color="Blue", seating_capacity=5, rent_per_day=1850, availability="Available"),
+        dict(vehicle_id="VR001", type="Sedan", make="Maruti", model="Swift", year=2022, color="White", seating_capacity=5, rent_per_day=1800, is_available=True),
+        dict(vehicle_id="VR002", type="Sedan", make="Hyundai", model="i20", year=2023, color="Silver", seating_capacity=5, rent_per_day=1950, is_available=True),
+        dict(vehicle_id="VR003", type="Sedan", make="Honda", model="Amaze", year=2021, color="Grey", seating_capacity=5, rent_per_day=2000, is_available=False),
+        dict(vehicle_id="VR004", type="Sedan", make="Tata", model="Tigor", year=2024, color="Blue", seating_capacity=5, rent_per_day=1850, is_available=True),
 
         # 🚙 SUVs
-        Vehicle(vehicle_id="VR005", type="SUV", make="Mahindra", model="XUV700", year=2024, color="Black", seating_capacity=7, rent_per_day=3500, availability="Available"),
-        Vehicle(vehicle_id="VR006", type="SUV", make="Kia", model="Seltos", year=2023, color="White", seating_capacity=5, rent_per_day=2600, availability="Unavailable"),
-        Vehicle(vehicle_id="VR007", type="SUV", make="Tata", model="Harrier", year=2023, color="Red", seating_capacity=5, rent_per_day=2800, availability="Available"),
-        Vehicle(vehicle_id="VR008", type="SUV", make="Hyundai", model="Creta", year=2022, color="Black", seating_capacity=5, rent_per_day=2700, availability="Available"),
+        dict(vehicle_id="VR005", type="SUV", make="Mahindra", model="XUV700", year=2024, color="Black", seating_capacity=7, rent_per_day=3500, is_available=True),
+        dict(vehicle_id="VR006", type="SUV", make="Kia", model="Seltos", year=2023, color="White", seating_capacity=5, rent_per_day=2600, is_available=False),
+        dict(vehicle_id="VR007", type="SUV", make="Tata", model="Harrier", year=2023, color="Red", seating_capacity=5, rent_per_day=2800, is_available=True),
+        dict(vehicle_id="VR008", type="SUV", make="Hyundai", model="Creta", year=2022, color="Black", seating_capacity=5, rent_per_day=2700, is_available=True),
 
         # 🚘 Hatchbacks
-        Vehicle(vehicle_id="VR009", type="Hatchback", make="Maruti", model="Baleno", year=2023, color="Red", seating_capacity=5, rent_per_day=1700, availability="Available"),
-        Vehicle(vehicle_id="VR010", type="Hatchback", make="Hyundai", model="Grand i10 Nios", year=2022, color="White", seating_capacity=5, rent_per_day=1650, availability="Available"),
+        dict(vehicle_id="VR009", type="Hatchback", make="Maruti", model="Baleno", year=2023, color="Red", seating_capacity=5, rent_per_day=1700, is_available=True),
+        dict(vehicle_id="VR010", type="Hatchback", make="Hyundai", model="Grand i10 Nios", year=2022, color="White", seating_capacity=5, rent_per_day=1650, is_available=True),
 
         # 🏍️ Bikes
-        Vehicle(vehicle_id="VR011", type="Bike", make="Royal Enfield", model="Classic 350", year=2023, color="Black", seating_capacity=2, rent_per_day=1000, availability="Available"),
-        Vehicle(vehicle_id="VR012", type="Bike", make="Bajaj", model="Pulsar 220F", year=2022, color="Blue", seating_capacity=2, rent_per_day=850, availability="Available"),
-        Vehicle(vehicle_id="VR013", type="Bike", make="Honda", model="CB Hornet", year=2021, color="Red", seating_capacity=2, rent_per_day=800, availability="Unavailable"),
-        Vehicle(vehicle_id="VR014", type="Bike", make="TVS", model="Apache RTR", year=2023, color="White", seating_capacity=2, rent_per_day=900, availability="Available"),
+        dict(vehicle_id="VR011", type="Bike", make="Royal Enfield", model="Classic 350", year=2023, color="Black", seating_capacity=2, rent_per_day=1000, is_available=True),
+        dict(vehicle_id="VR012", type="Bike", make="Bajaj", model="Pulsar 220F", year=2022, color="Blue", seating_capacity=2, rent_per_day=850, is_available=True),
+        dict(vehicle_id="VR013", type="Bike", make="Honda", model="CB Hornet", year=2021, color="Red", seating_capacity=2, rent_per_day=800, is_available=False),
+        dict(vehicle_id="VR014", type="Bike", make="TVS", model="Apache RTR", year=2023, color="White", seating_capacity=2, rent_per_day=900, is_available=True),
 
         # 🚗 Luxury Cars
-        Vehicle(vehicle_id="VR015", type="Luxury", make="BMW", model="5 Series", year=2024, color="Black", seating_capacity=5, rent_per_day=7000, availability="Available"),
-        Vehicle(vehicle_id="VR016", type="Luxury", make="Audi", model="A6", year=2023, color="White", seating_capacity=5, rent_per_day=7500, availability="Available"),
-        Vehicle(vehicle_id="VR017", type="Luxury", make="Mercedes", model="E-Class", year=2023, color="Grey", seating_capacity=5, rent_per_day=8000, availability="Unavailable"),
+        dict(vehicle_id="VR015", type="Luxury", make="BMW", model="5 Series", year=2024, color="Black", seating_capacity=5, rent_per_day=7000, is_available=True),
+        dict(vehicle_id="VR016", type="Luxury", make="Audi", model="A6", year=2023, color="White", seating_capacity=5, rent_per_day=7500, is_available=True),
+        dict(vehicle_id="VR017", type="Luxury", make="Mercedes", model="E-Class", year=2023, color="Grey", seating_capacity=5, rent_per_day=8000, is_available=False),
 
         # 🛻 Others
-        Vehicle(vehicle_id="VR018", type="Pickup", make="Isuzu", model="D-Max", year=2022, color="Silver", seating_capacity=5, rent_per_day=3200, availability="Available"),
-        Vehicle(vehicle_id="VR019", type="Van", make="Toyota", model="Innova", year=2021, color="Beige", seating_capacity=7, rent_per_day=3000, availability="Available"),
-        Vehicle(vehicle_id="VR020", type="Luxury", make="Jaguar", model="XF", year=2024, color="Blue", seating_capacity=5, rent_per_day=8500, availability="Available")
+        dict(vehicle_id="VR018", type="Pickup", make="Isuzu", model="D-Max", year=2022, color="Silver", seating_capacity=5, rent_per_day=3200, is_available=True),
+        dict(vehicle_id="VR019", type="Van", make="Toyota", model="Innova", year=2021, color="Beige", seating_capacity=7, rent_per_day=3000, is_available=True),
+        dict(vehicle_id="VR020", type="Luxury", make="Jaguar", model="XF", year=2024, color="Blue", seating_capacity=5, rent_per_day=8500, is_available=True)
     ]
 
-    db.session.add_all(dummy_vehicles)
+    # bulk_insert_mappings skips per-object ORM bookkeeping (identity
+    # map, unit-of-work), which matters once seeding/import grows
+    db.session.bulk_insert_mappings(Vehicle, dummy_vehicles)
+    db.session.commit()
+    # Populate sqlite_stat1 so the planner actually picks the indexes
+    db.session.execute(text('ANALYZE'))
     db.session.commit()
 
+@app.cli.command('seed')
+def seed():
+    """Create tables and load seed data (run once per deploy: `flask seed`)."""
+    db.create_all()
+    insert_dummy_vehicles()
+
+    if not User.query.filter_by(username="admin1").first():
+        admin = User(
+            full_name="Admin User",
+            email="admin@example.com",
+            username="admin1",
+            role="admin"
+        )
+        admin.set_password("admin123")
+        db.session.add(admin)
+        db.session.commit()
+
+# Compile every template up front (cheap: a dozen files). Under a
+# preloading server this runs once in the master process, and the
+# filesystem bytecode cache persists the result across restarts, so no
+# request ever pays the Jinja parse/compile cost.
+for _name in app.jinja_env.list_templates(filter_func=lambda n: n.endswith('.html')):
+    app.jinja_env.get_template(_name)
+
 # --------------------------- Run App ---------------------------
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
-        insert_dummy_vehicles()
-
-        if not User.query.filter_by(username="admin1").first():
-            admin = User(
-                full_name="Admin User",
-                email="admin@example.com",
-                username="admin1",
-                role="admin"
-            )
-            admin.set_password("admin123")
-            db.session.add(admin)
-            db.session.commit()
-
     app.run(debug=True)
@@ -0,0 +1,18 @@
+"""ASGI entry point for the vehicle-rental app.
+
+Wraps the Flask WSGI app so it can run under an ASGI server, e.g.:
+
+    uvicorn asgi:asgi_app --workers 4
+
+The adapter hands each request to a worker thread via asgiref's
+sync_to_async, so blocking work — SQLite I/O and in particular the
+~tens-of-ms Argon2 password verify on login — runs off the event loop.
+The loop stays free to accept and interleave other requests; Argon2
+releases the GIL during hashing, so verifies on different threads
+overlap rather than serialize.
+"""
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app
+
+asgi_app = WsgiToAsgi(app)
@@ -1,12 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, update
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Boolean
 
 # Database setup
 Base = declarative_base()
 engine = create_engine('sqlite:///rental.db')
 Session = sessionmaker(bind=engine)
-session = Session()
 
 # Vehicle model
 class Vehicle(Base):
@@ -20,12 +19,16 @@ class Vehicle(Base):
     color = Column(String)
     seating_capacity = Column(Integer)
     rent_per_day = Column(Integer)
-    availability = Column(String)
+    is_available = Column(Boolean)
 
-# Update all vehicles to available
-vehicles = session.query(Vehicle).all()
-for v in vehicles:
-    v.availability = "Available"
-session.commit()
 
-print(f"Updated {len(vehicles)} vehicles to 'Available'")
+def reset_availability():
+    """Mark every vehicle available with a single bulk UPDATE."""
+    session = Session()
+    result = session.execute(update(Vehicle).values(is_available=True))
+    session.commit()
+    print(f"Updated {result.rowcount} vehicles to available")
+
+
+if __name__ == '__main__':
+    reset_availability()